@@ -1,30 +1,30 @@
 """Main CLI entry point for kekkai."""
 
 import argparse
-import difflib
+import functools
 import json
 import os
-import shutil
 import subprocess
 import sys
-from dataclasses import asdict, dataclass
-from datetime import datetime, timezone
+from dataclasses import dataclass
 from pathlib import Path
-
-from rich.console import Console
+from types import ModuleType
 
 from . import __version__
 from .errors import NotJJRepoError, NotRootWorkspaceError, WorkspaceExistsError
-from .jj import JJClient
+from .jj import JJClient, Workspace
 
 SHIM_DIR = ".jj/.kekkai-bin"
 AGENT_MARKER_FILE = ".jj/kekkai-agent"
+REPO_CONFIGURED_FILE = ".jj/kekkai-configured"
+STRICT_WRITE_CHECK_ENV = "KEKKAI_STRICT_WRITE_CHECK"
 
 SHIM_CONTENT = """\
 #!/bin/sh
 echo "git disabled for agents; use jj" >&2
 exit 1
 """
+SHIM_CONTENT_BYTES = SHIM_CONTENT.encode("ascii")
 
 
 @dataclass(frozen=True)
@@ -40,16 +40,52 @@ AGENTS: dict[str, Agent] = {
     "claude": Agent("claude", "claude"),
 }
 DEFAULT_AGENT = "codex"
+# Agent assumed for markers written before the field existed
+MARKER_DEFAULT_AGENT = "claude"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AgentMarker:
-    """Metadata stored in the agent marker file."""
+    """Metadata stored in the agent marker file.
+
+    Documents the marker schema; create_agent_marker writes the fields
+    directly.
+    """
 
     root_workspace: str
     name: str
     created_at: str
-    agent: str = "claude"  # default for backward compatibility
+    agent: str = MARKER_DEFAULT_AGENT
+
+
+@functools.cache
+def _load_orjson() -> ModuleType | None:
+    """Return the orjson module, or None if it is not installed.
+
+    orjson is an optional speedup (see the "orjson" extra), imported on
+    first marker access so commands that never touch a marker skip its cost.
+    """
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def dump_marker(payload: dict) -> bytes:
+    """Serialize marker data, using orjson when it is installed."""
+    fast = _load_orjson()
+    if fast is not None:
+        return fast.dumps(payload, option=fast.OPT_INDENT_2)
+    return json.dumps(payload, indent=2, ensure_ascii=False).encode()
+
+
+def load_marker(data: bytes) -> dict:
+    """Parse marker data, using orjson when it is installed."""
+    fast = _load_orjson()
+    if fast is not None:
+        return fast.loads(data)
+    return json.loads(data)
 
 
 def find_root_workspace(client: JJClient) -> str:
@@ -59,23 +95,64 @@ def find_root_workspace(client: JJClient) -> str:
     Otherwise, returns the current jj workspace root.
     """
     current_root = client.workspace_root()
-    marker_path = Path(current_root) / AGENT_MARKER_FILE
+    marker = read_agent_marker(current_root)
 
-    if marker_path.exists():
-        try:
-            data = json.loads(marker_path.read_text())
-            if root := data.get("root_workspace"):
-                return root
-        except (json.JSONDecodeError, OSError):
-            pass
+    if marker and (root := marker.get("root_workspace")):
+        return root
 
     return current_root
 
 
+def read_agent_marker(workspace_path: str | Path) -> dict | None:
+    """Read the agent marker of a workspace.
+
+    Returns None if the workspace has no marker, or an empty dict if the
+    marker exists but cannot be read.
+    """
+    marker_path = os.path.join(workspace_path, AGENT_MARKER_FILE)
+    try:
+        with open(marker_path, "rb") as f:
+            return load_marker(f.read())
+    except FileNotFoundError:
+        return None
+    except (ValueError, OSError):  # includes JSON and UTF-8 decode errors
+        return {}
+
+
+def load_agent_markers(root: str, workspaces: list[Workspace]) -> dict[str, dict]:
+    """Read the marker of each kekkai agent workspace once.
+
+    Returns a mapping of jj workspace name to marker data, limited to
+    sibling workspaces of root that carry a marker file.
+    """
+    parent, repo_name = os.path.split(root.rstrip(os.sep))
+    prefix = f"{repo_name}-"
+    markers: dict[str, dict] = {}
+
+    # One directory scan up front spares a marker lookup for every
+    # workspace whose sibling directory is already gone
+    try:
+        with os.scandir(parent) as entries:
+            siblings = {entry.name for entry in entries if entry.is_dir()}
+    except OSError:
+        siblings = None
+
+    for ws in workspaces:
+        # Skip default workspace and anything kekkai did not create
+        if ws.name == "default" or not ws.name.startswith(prefix):
+            continue
+        if siblings is not None and ws.name not in siblings:
+            continue
+        marker = read_agent_marker(os.path.join(parent, ws.name))
+        if marker is not None:
+            markers[ws.name] = marker
+
+    return markers
+
+
 def ensure_root_workspace(root: str) -> None:
     """Ensure the command is run from the root workspace."""
-    marker_path = Path(root) / AGENT_MARKER_FILE
-    if marker_path.exists():
+    if os.path.exists(os.path.join(root, AGENT_MARKER_FILE)):
         raise NotRootWorkspaceError("look must be run from the root workspace")
 
 
@@ -83,46 +160,84 @@ def suggest_agent_names(query: str, candidates: list[str]) -> list[str]:
     """Return a short list of suggested agent names."""
     if not candidates:
         return []
-    lookup = {name.lower(): name for name in candidates}
-    matches = difflib.get_close_matches(
-        query.lower(), lookup.keys(), n=3, cutoff=0.5
+    from rapidfuzz import fuzz, process, utils
+
+    matches = process.extract(
+        query,
+        candidates,
+        scorer=fuzz.WRatio,
+        processor=utils.default_process,
+        limit=3,
+        score_cutoff=50,
     )
-    suggestions = [lookup[name] for name in matches]
+    suggestions = [match[0] for match in matches]
     if suggestions:
         return suggestions
     return [name for name in candidates if query.lower() in name.lower()]
 
 
+def compute_agent_paths(root_path: str, agent_name: str) -> tuple[str, str]:
+    """Return the sibling workspace path and jj workspace name for an agent."""
+    parent, repo_name = os.path.split(root_path.rstrip(os.sep))
+    jj_workspace_name = f"{repo_name}-{agent_name}"
+    return os.path.join(parent, jj_workspace_name), jj_workspace_name
+
+
 def compute_agent_path(root_path: str, agent_name: str) -> str:
     """Compute the sibling workspace path."""
-    root = Path(root_path)
-    return str(root.parent / f"{root.name}-{agent_name}")
+    return compute_agent_paths(root_path, agent_name)[0]
 
 
 def compute_jj_workspace_name(root_path: str, agent_name: str) -> str:
     """Return the jj workspace name for an agent."""
-    return f"{Path(root_path).name}-{agent_name}"
+    return compute_agent_paths(root_path, agent_name)[1]
 
 
 def create_agent_marker(
     workspace_path: str, root_path: str, name: str, agent: str
 ) -> None:
     """Write the agent marker file."""
-    marker = AgentMarker(
-        root_workspace=root_path,
-        name=name,
-        created_at=datetime.now(timezone.utc).isoformat(),
-        agent=agent,
-    )
+    from datetime import datetime, timezone
+
+    # Fields mirror AgentMarker
+    payload = {
+        "root_workspace": root_path,
+        "name": name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "agent": agent,
+    }
     marker_path = Path(workspace_path) / AGENT_MARKER_FILE
-    marker_path.write_text(json.dumps(asdict(marker), indent=2))
+    marker_path.write_bytes(dump_marker(payload))
+
+
+def ensure_repo_config(client: JJClient, root_path: str) -> None:
+    """Apply kekkai's repo-level jj settings once per repository.
+
+    Repo config is shared by every workspace, so a stamp file in the root
+    workspace records that the settings are in place and later runs skip
+    the jj call.
+    """
+    stamp = Path(root_path) / REPO_CONFIGURED_FILE
+    if stamp.exists():
+        return
+    client.config_set("snapshot.auto-update-stale", "true", cwd=root_path)
+    stamp.touch()
 
 
 def check_parent_writable(root_path: str) -> None:
-    """Verify we can write to the parent directory."""
+    """Verify we can write to the parent directory.
+
+    os.access can be wrong on NFS or with ACLs; setting
+    KEKKAI_STRICT_WRITE_CHECK=1 additionally probes with a real write.
+    """
     parent = Path(root_path).parent
-    test_file = parent / ".kekkai-write-test"
+    if not os.access(parent, os.W_OK):
+        raise PermissionError(f"parent directory {parent} is not writable")
+
+    if os.environ.get(STRICT_WRITE_CHECK_ENV) != "1":
+        return
 
+    test_file = parent / ".kekkai-write-test"
     try:
         test_file.write_text("test")
         test_file.unlink()
@@ -130,25 +245,58 @@ def check_parent_writable(root_path: str) -> None:
         raise PermissionError(f"parent directory {parent} is not writable: {e}")
 
 
-def has_uncommitted_changes(client: JJClient, workspace_path: str) -> bool:
-    """Check if workspace has uncommitted changes."""
+def launch_agent(agent: Agent, workspace_path: str, env: dict[str, str]) -> int:
+    """Run the agent in its workspace with terminal passthrough."""
+    return subprocess.run([agent.executable], cwd=workspace_path, env=env).returncode
+
+
+def has_uncommitted_changes(client: JJClient, workspace_path: str) -> bool | None:
+    """Check if workspace has uncommitted changes.
+
+    Returns None if jj status fails and the state is unknown.
+    """
+    lines = client.status_iter(cwd=workspace_path)
     try:
-        output = client.status(cwd=workspace_path)
-        return "Working copy changes:" in output
+        return any(line.startswith("Working copy changes:") for line in lines)
     except Exception:
+        return None
+    finally:
+        lines.close()
+
+
+def keep_workspace_prompt(dirty: bool) -> bool:
+    """Ask whether to keep the workspace for inspection.
+
+    dirty is True when the workspace has, or may have, uncommitted changes.
+    Non-interactive runs skip the prompt and keep the workspace only in
+    that case, so unsaved work is never removed silently.
+    """
+    if not sys.stdin.isatty():
+        return dirty
+    try:
+        answer = input("\nKeep workspace for inspection? [y/N] ").strip().lower()
+    except (EOFError, KeyboardInterrupt):
         return False
+    return answer in ("y", "yes")
 
 
 def cleanup(
     client: JJClient, jj_workspace_name: str, workspace_path: str, root_path: str
 ) -> None:
     """Clean up workspace resources."""
+    import shutil
+
     ws_path = Path(workspace_path)
 
-    # Remove .git directory first so jj can work properly
+    # Remove .git directory first so jj can work properly. kekkai creates
+    # it empty, so rmdir is enough unless the agent put something in it.
     git_dir = ws_path / ".git"
-    if git_dir.exists():
-        shutil.rmtree(git_dir)
+    try:
+        os.rmdir(git_dir)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        shutil.rmtree(git_dir, ignore_errors=True)
 
     # Remove marker file
     marker = ws_path / AGENT_MARKER_FILE
@@ -162,14 +310,18 @@ def cleanup(
         print(f"Warning: failed to forget workspace: {e}", file=sys.stderr)
 
     # Remove directory
-    try:
-        shutil.rmtree(workspace_path)
-    except Exception as e:
-        print(f"Warning: failed to remove workspace directory: {e}", file=sys.stderr)
+    shutil.rmtree(workspace_path, ignore_errors=True)
+    if os.path.exists(workspace_path):
+        print(
+            f"Warning: failed to remove workspace directory: {workspace_path}",
+            file=sys.stderr,
+        )
 
 
 def run_agent(name: str, agent: Agent) -> None:
     """Create workspace and run agent."""
+    from rich.console import Console
+
     client = JJClient()
     console = Console()
 
@@ -189,9 +341,8 @@ def run_agent(name: str, agent: Agent) -> None:
             sys.exit(1)
 
         # 3. Compute sibling workspace path
-        workspace_path = compute_agent_path(root, name)
+        workspace_path, jj_workspace_name = compute_agent_paths(root, name)
         shim_path = Path(workspace_path) / SHIM_DIR
-        jj_workspace_name = compute_jj_workspace_name(root, name)
 
         # 4. Create workspace via jj workspace add
         try:
@@ -204,14 +355,9 @@ def run_agent(name: str, agent: Agent) -> None:
             console.print(f"Error creating workspace: {e}", style="red")
             sys.exit(1)
 
-        # 5. Configure jj to auto-update stale working copies
+        # 5. Configure jj to auto-update stale working copies (once per repo)
         try:
-            subprocess.run(
-                ["jj", "config", "set", "--repo", "snapshot.auto-update-stale", "true"],
-                cwd=workspace_path,
-                capture_output=True,
-                check=True,
-            )
+            ensure_repo_config(client, root)
         except Exception:
             pass  # Non-fatal if this fails
 
@@ -221,12 +367,12 @@ def run_agent(name: str, agent: Agent) -> None:
         except Exception:
             pass  # Non-fatal if this fails
 
-        # 7. Create .git directory (scopes Claude to workspace)
-        git_dir = Path(workspace_path) / ".git"
+        # 7. Create .git directory (scopes Claude to workspace) and shim directory
         try:
-            git_dir.mkdir(parents=True, exist_ok=True)
+            os.makedirs(os.path.join(workspace_path, ".git"), exist_ok=True)
+            os.makedirs(shim_path, exist_ok=True)
         except OSError as e:
-            console.print(f"Error creating .git directory: {e}", style="red")
+            console.print(f"Error creating workspace directories: {e}", style="red")
             cleanup(client, jj_workspace_name, workspace_path, root)
             sys.exit(1)
 
@@ -240,41 +386,36 @@ def run_agent(name: str, agent: Agent) -> None:
 
         # 9. Create git shim
         try:
-            shim_path.mkdir(parents=True, exist_ok=True)
             shim_script = shim_path / "git"
-            shim_script.write_text(SHIM_CONTENT)
-            shim_script.chmod(0o755)
+            shim_script.write_bytes(SHIM_CONTENT_BYTES)
+            os.chmod(shim_script, 0o755)
         except OSError as e:
             console.print(f"Error creating git shim: {e}", style="red")
             cleanup(client, jj_workspace_name, workspace_path, root)
             sys.exit(1)
 
         # 10. Build env with shim in PATH
-        env = os.environ.copy()
-        env["PATH"] = f"{shim_path}:{env.get('PATH', '')}"
+        env = {**os.environ, "PATH": f"{shim_path}:{os.environ.get('PATH', '')}"}
 
     # 11. Run agent with terminal passthrough (outside spinner)
-    result = subprocess.run([agent.executable], cwd=workspace_path, env=env)
+    returncode = launch_agent(agent, workspace_path, env)
 
-    if result.returncode != 0:
-        print(f"\n{agent.name.capitalize()} exited with code {result.returncode}", file=sys.stderr)
+    if returncode != 0:
+        print(f"\n{agent.name.capitalize()} exited with code {returncode}", file=sys.stderr)
 
     # 11. Check for uncommitted changes
-    if has_uncommitted_changes(client, workspace_path):
+    dirty = has_uncommitted_changes(client, workspace_path)
+    if dirty:
         print("\nWarning: This workspace has uncommitted changes!")
+    elif dirty is None:
+        print("\nWarning: could not check this workspace for uncommitted changes")
 
-    # 12. Prompt for cleanup
-    try:
-        answer = input("\nKeep workspace for inspection? [y/N] ").strip().lower()
-    except (EOFError, KeyboardInterrupt):
-        answer = ""
-
-    # 13. Cleanup or keep
-    if answer not in ("y", "yes"):
+    # 12. Prompt for cleanup, then cleanup or keep (unknown counts as dirty)
+    if keep_workspace_prompt(dirty is not False):
+        print(f"Workspace kept at: {workspace_path}")
+    else:
         cleanup(client, jj_workspace_name, workspace_path, root)
         print(f"Workspace '{name}' removed")
-    else:
-        print(f"Workspace kept at: {workspace_path}")
 
 
 def list_workspaces() -> None:
@@ -293,30 +434,19 @@ def list_workspaces() -> None:
         print(f"Error listing workspaces: {e}", file=sys.stderr)
         sys.exit(1)
 
-    repo_name = Path(root).name
-    prefix = f"{repo_name}-"
+    prefix = f"{Path(root).name}-"
+    markers = load_agent_markers(root, workspaces)
 
     found = False
     for ws in workspaces:
-        # Skip default workspace
-        if ws.name == "default":
+        if ws.name not in markers:
             continue
 
-        # Check if this is a kekkai agent workspace
-        if ws.name.startswith(prefix):
-            agent_name = ws.name[len(prefix) :]
-
-            # Verify it has the agent marker
-            agent_path = Path(root).parent / ws.name
-            marker_path = agent_path / AGENT_MARKER_FILE
-            if marker_path.exists():
-                try:
-                    data = json.loads(marker_path.read_text())
-                    agent_type = data.get("agent", "claude")
-                except (json.JSONDecodeError, OSError):
-                    agent_type = "unknown"
-                print(f"{agent_name} [{agent_type}]: {ws.change_id} {ws.commit_id} {ws.summary}")
-                found = True
+        agent_name = ws.name[len(prefix) :]
+        marker = markers[ws.name]
+        agent_type = marker.get("agent", MARKER_DEFAULT_AGENT) if marker else "unknown"
+        print(f"{agent_name} [{agent_type}]: {ws.change_id} {ws.commit_id} {ws.summary}")
+        found = True
 
     if not found:
         print("No workspaces")
@@ -344,20 +474,11 @@ def look_workspace(agent_name: str) -> None:
         print(f"Error listing workspaces: {e}", file=sys.stderr)
         sys.exit(1)
 
-    repo_name = Path(root).name
-    prefix = f"{repo_name}-"
-    agents: dict[str, str] = {}
-
-    for ws in workspaces:
-        if ws.name == "default":
-            continue
-        if not ws.name.startswith(prefix):
-            continue
-        agent = ws.name[len(prefix) :]
-        agent_path = Path(root).parent / ws.name
-        marker_path = agent_path / AGENT_MARKER_FILE
-        if marker_path.exists():
-            agents[agent] = ws.name
+    prefix = f"{Path(root).name}-"
+    agents: dict[str, str] = {
+        ws_name[len(prefix) :]: ws_name
+        for ws_name in load_agent_markers(root, workspaces)
+    }
 
     if agent_name not in agents:
         print(f"Error: agent workspace '{agent_name}' not found", file=sys.stderr)
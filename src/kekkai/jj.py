@@ -1,7 +1,9 @@
 """jj CLI wrapper."""
 
+import functools
 import re
 import subprocess
+from collections.abc import Iterator
 from dataclasses import dataclass
 
 from .errors import (
@@ -13,7 +15,7 @@ from .errors import (
 )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Workspace:
     """Represents a jj workspace."""
 
@@ -25,16 +27,62 @@ class Workspace:
 
 # Parses lines like: default: wpxqlmox f3c3a79d (no description set)
 WORKSPACE_LINE_RE = re.compile(r"^(\S+): (\S+) (\S+) (.*)$")
+_find_whitespace = re.compile(r"\s").search
+
+
+def _parse_line_fallback(line: str) -> Workspace | None:
+    """Parse a workspace line with the regex, or None if it does not match."""
+    match = WORKSPACE_LINE_RE.match(line)
+    if match:
+        return Workspace(*match.groups())
+    return None
+
+
+def _parse_workspace_line(line: str) -> Workspace | None:
+    """Parse one line of jj workspace list output.
+
+    The format is space-delimited, so a plain split handles well-formed
+    lines; anything irregular, such as empty fields or other whitespace
+    inside one, goes through the regex.
+    """
+    try:
+        name_colon, change_id, commit_id, summary = line.split(" ", 3)
+    except ValueError:
+        return _parse_line_fallback(line)
+    name = name_colon[:-1]
+    if (
+        not name
+        or not name_colon.endswith(":")
+        or not change_id
+        or not commit_id
+        or _find_whitespace(name_colon + change_id + commit_id)
+    ):
+        return _parse_line_fallback(line)
+    return Workspace(name, change_id, commit_id, summary)
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_executable(name: str) -> str:
+    """Return the absolute path of an executable, or name if not on PATH."""
+    import shutil
+
+    return shutil.which(name) or name
+
+
+# Maps jj stderr fragments to the exception they indicate
+ERROR_MARKERS: dict[str, type[KekkaiError]] = {
+    "There is no jj repo in": NotJJRepoError,
+    "already exists": WorkspaceExistsError,
+    "No such workspace": WorkspaceNotFoundError,
+}
+ERROR_MARKER_RE = re.compile("|".join(map(re.escape, ERROR_MARKERS)))
 
 
 def _parse_error(cmd: str, stderr: str, returncode: int) -> KekkaiError:
     """Convert subprocess error to typed exception."""
-    if "There is no jj repo in" in stderr:
-        return NotJJRepoError(stderr)
-    if "already exists" in stderr:
-        return WorkspaceExistsError(stderr)
-    if "No such workspace" in stderr:
-        return WorkspaceNotFoundError(stderr)
+    match = ERROR_MARKER_RE.search(stderr)
+    if match:
+        return ERROR_MARKERS[match.group(0)](stderr)
     return JJCommandError(cmd, stderr, returncode)
 
 
@@ -47,7 +95,7 @@ class JJClient:
     def _run(self, *args: str, cwd: str | None = None) -> str:
         """Execute jj command and return stdout."""
         result = subprocess.run(
-            [self.jj_path, *args],
+            [_resolve_executable(self.jj_path), *args],
             capture_output=True,
             text=True,
             cwd=cwd,
@@ -77,26 +125,46 @@ class JJClient:
     def workspace_list(self, cwd: str | None = None) -> list[Workspace]:
         """Return all workspaces in the repository."""
         output = self._run("workspace", "list", cwd=cwd)
-        workspaces = []
-        for line in output.strip().split("\n"):
-            if not line:
-                continue
-            match = WORKSPACE_LINE_RE.match(line)
-            if match:
-                workspaces.append(
-                    Workspace(
-                        name=match.group(1),
-                        change_id=match.group(2),
-                        commit_id=match.group(3),
-                        summary=match.group(4),
-                    )
-                )
-        return workspaces
+        return [
+            ws for line in output.split("\n") if (ws := _parse_workspace_line(line))
+        ]
+
+    def config_set(self, name: str, value: str, cwd: str | None = None) -> None:
+        """Set a repo-level jj config value."""
+        self._run("config", "set", "--repo", name, value, cwd=cwd)
 
     def status(self, cwd: str | None = None) -> str:
         """Return jj status output."""
         return self._run("status", cwd=cwd)
 
+    def status_iter(self, cwd: str | None = None) -> Iterator[str]:
+        """Yield jj status output line by line.
+
+        Closing the iterator early terminates jj, so callers can stop as
+        soon as they have seen what they need. stderr goes to a temporary
+        file rather than a pipe, so jj can never block on warnings nobody
+        is reading yet.
+        """
+        import tempfile
+
+        with tempfile.TemporaryFile() as stderr:
+            with subprocess.Popen(
+                [_resolve_executable(self.jj_path), "status"],
+                stdout=subprocess.PIPE,
+                stderr=stderr,
+                text=True,
+                cwd=cwd,
+            ) as proc:
+                try:
+                    yield from proc.stdout
+                except GeneratorExit:
+                    proc.terminate()
+                    raise
+            if proc.returncode != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                raise _parse_error("status", message, proc.returncode)
+
     def new(self, revision: str, cwd: str | None = None) -> str:
         """Create a new revision based on the given revision."""
         return self._run("new", "-r", revision, cwd=cwd)
@@ -1,24 +1,135 @@
 """Pytest fixtures for kekkai tests."""
 
+import re
+import shutil
 import subprocess
-import tempfile
 from pathlib import Path
 
 import pytest
 
+from kekkai.cli import (
+    SHIM_CONTENT_BYTES,
+    SHIM_DIR,
+    compute_agent_path,
+    create_agent_marker,
+)
+from kekkai.jj import JJClient
+
+
+@pytest.fixture(scope="session")
+def jj_client():
+    """Provide one JJClient for the whole test session."""
+    return JJClient()
 
-@pytest.fixture
-def temp_jj_repo(tmp_path):
-    """Create a temporary jj repository for testing.
+
+@pytest.fixture(scope="session")
+def session_jj_repo(tmp_path_factory):
+    """Create one jj repository shared by the whole test session.
 
     Creates a parent directory to hold both the repo and sibling workspaces.
+    Any sibling workspace directory still present at the end of the session
+    is removed.
     """
-    repo_dir = tmp_path / "testrepo"
+    repo_dir = tmp_path_factory.mktemp("jj-root") / "testrepo"
     repo_dir.mkdir()
 
     subprocess.run(["jj", "git", "init"], cwd=repo_dir, check=True, capture_output=True)
 
-    return repo_dir
+    yield repo_dir
+
+    for path in repo_dir.parent.glob(f"{repo_dir.name}-*"):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def temp_jj_repo(session_jj_repo):
+    """Provide the shared jj repository to a single test.
+
+    Afterwards the repo is restored to the operation it started from, which
+    undoes revisions created on the root workspace and forgets workspaces
+    added during the test, so each test starts from the same state.
+    """
+    result = subprocess.run(
+        ["jj", "op", "log", "--no-graph", "-n", "1", "-T", "id"],
+        cwd=session_jj_repo,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    start_op = result.stdout.strip()
+
+    yield session_jj_repo
+
+    subprocess.run(
+        ["jj", "op", "restore", start_op],
+        cwd=session_jj_repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def unique_name(request):
+    """Return a factory for agent names unique to the current test.
+
+    Sibling workspace directories outlive the test that created them, so
+    names are derived from the test id to avoid collisions.
+    """
+    test_id = re.sub(r"[^A-Za-z0-9]+", "-", request.node.name.removeprefix("test_"))
+    test_id = test_id.strip("-")
+
+    def _unique(base: str) -> str:
+        return f"{test_id}-{base}"
+
+    return _unique
+
+
+@pytest.fixture
+def make_agent(temp_jj_repo, jj_client):
+    """Return a factory that sets up a sibling agent workspace.
+
+    The workspace is added to jj and given an agent marker; the .git
+    directory and git shim are created on request. Returns the path.
+    Workspace directories created this way are removed after the test.
+    """
+    created: list[str] = []
+
+    def _make(
+        name: str, *, shim: bool = False, git: bool = False, agent: str = "codex"
+    ) -> str:
+        path = compute_agent_path(str(temp_jj_repo), name)
+        jj_client.workspace_add(path, cwd=str(temp_jj_repo))
+        created.append(path)
+        create_agent_marker(path, str(temp_jj_repo), name, agent)
+
+        for subdir, wanted in ((".git", git), (SHIM_DIR, shim)):
+            if wanted:
+                (Path(path) / subdir).mkdir(parents=True)
+
+        if shim:
+            shim_script = Path(path) / SHIM_DIR / "git"
+            shim_script.write_bytes(SHIM_CONTENT_BYTES)
+            shim_script.chmod(0o755)
+
+        return path
+
+    yield _make
+
+    for path in created:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def stub_jj(tmp_path):
+    """Return a factory for clients whose jj is the given shell script."""
+
+    def _stub(script: str) -> JJClient:
+        jj_path = tmp_path / "jj"
+        jj_path.write_text(f"#!/bin/sh\n{script}")
+        jj_path.chmod(0o755)
+        return JJClient(jj_path=str(jj_path))
+
+    return _stub
 
 
 @pytest.fixture
@@ -1,5 +1,6 @@
 """Tests for kekkai.cli module."""
 
+import functools
 import json
 import os
 import subprocess
@@ -11,101 +12,119 @@ import pytest
 from kekkai.cli import (
     AGENT_MARKER_FILE,
     AGENTS,
+    REPO_CONFIGURED_FILE,
     SHIM_DIR,
     Agent,
     AgentMarker,
     check_parent_writable,
     cleanup,
     compute_agent_path,
+    compute_agent_paths,
     compute_jj_workspace_name,
-    create_agent_marker,
+    dump_marker,
+    ensure_repo_config,
     find_root_workspace,
+    has_uncommitted_changes,
+    keep_workspace_prompt,
+    list_workspaces,
+    load_marker,
     look_workspace,
     main,
     run_agent,
+    suggest_agent_names,
 )
 from kekkai.jj import JJClient
 
 
-def test_compute_agent_path():
-    """Test agent path computation."""
-    cases = [
+@pytest.mark.parametrize(
+    "root,name,expected",
+    [
         ("/Users/dev/myproject", "feature-auth", "/Users/dev/myproject-feature-auth"),
         ("/home/user/repo", "test", "/home/user/repo-test"),
         ("/tmp/dojo", "agent1", "/tmp/dojo-agent1"),
-    ]
-
-    for root, name, expected in cases:
-        assert compute_agent_path(root, name) == expected
+    ],
+)
+def test_compute_agent_path(root, name, expected):
+    """Test agent path computation."""
+    assert compute_agent_path(root, name) == expected
 
 
-def test_compute_jj_workspace_name():
-    """Test jj workspace name computation."""
-    cases = [
+@pytest.mark.parametrize(
+    "root,name,expected",
+    [
         ("/Users/dev/myproject", "feature-auth", "myproject-feature-auth"),
         ("/home/user/repo", "test", "repo-test"),
-    ]
+    ],
+)
+def test_compute_jj_workspace_name(root, name, expected):
+    """Test jj workspace name computation."""
+    assert compute_jj_workspace_name(root, name) == expected
 
-    for root, name, expected in cases:
-        assert compute_jj_workspace_name(root, name) == expected
 
+def test_compute_agent_paths():
+    """Test combined path and workspace name computation."""
+    assert compute_agent_paths("/home/user/repo", "test") == (
+        "/home/user/repo-test",
+        "repo-test",
+    )
 
-def test_find_root_workspace_from_root(temp_jj_repo):
-    """Test finding root workspace when in root."""
-    client = JJClient()
-    root = find_root_workspace(client)
-
-    # We need to be in the temp_jj_repo for this to work
-    old_cwd = os.getcwd()
-    os.chdir(temp_jj_repo)
-    try:
-        root = find_root_workspace(client)
-        expected = temp_jj_repo.resolve()
-        actual = Path(root).resolve()
-        assert actual == expected
-    finally:
-        os.chdir(old_cwd)
-
-
-def test_find_root_workspace_from_agent(temp_jj_repo):
-    """Test finding root workspace from an agent workspace."""
-    client = JJClient()
 
-    # Create a sibling agent workspace
-    agent_name = "test-agent"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        ("feature-prevew", ["feature-preview"]),
+        ("FEATURE-PREVIEW", ["feature-preview"]),  # case-insensitive
+        ("Bugfix", ["bugfix-login"]),
+        ("zzz", []),
+    ],
+)
+def test_suggest_agent_names(query, expected):
+    """Test fuzzy agent name suggestions."""
+    candidates = ["feature-preview", "bugfix-login", "docs"]
+    assert suggest_agent_names(query, candidates) == expected
 
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
 
-    # Create the agent marker pointing to root
-    create_agent_marker(agent_path, str(temp_jj_repo), agent_name, "codex")
+def test_suggest_agent_names_no_candidates():
+    """No candidates means no suggestions."""
+    assert suggest_agent_names("anything", []) == []
 
-    # Change to agent directory
-    old_cwd = os.getcwd()
-    os.chdir(agent_path)
-    try:
-        root = find_root_workspace(client)
-        assert root == str(temp_jj_repo)
-    finally:
-        os.chdir(old_cwd)
 
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_marker_round_trip(monkeypatch, use_orjson):
+    """Markers survive a dump/load round trip with either serializer."""
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr("kekkai.cli._load_orjson", lambda: None)
+    payload = {"root_workspace": "/tmp/repo", "name": "caf\u00e9", "agent": "codex"}
+
+    data = dump_marker(payload)
+
+    assert load_marker(data) == payload
+    assert json.loads(data) == payload  # stays plain JSON either way
+    assert "caf\u00e9".encode() in data  # non-ASCII is written as raw UTF-8
 
-def test_create_agent_marker(temp_jj_repo):
-    """Test agent marker creation."""
-    client = JJClient()
 
-    # Create sibling workspace
-    agent_name = "marker-test"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
+def test_marker_serializers_match(monkeypatch):
+    """orjson and the json fallback write byte-identical markers."""
+    pytest.importorskip("orjson")
+    payload = {"root_workspace": "/tmp/repo", "name": "caf\u00e9", "agent": "codex"}
+    fast = dump_marker(payload)
 
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
+    monkeypatch.setattr("kekkai.cli._load_orjson", lambda: None)
 
-    # Create marker
-    create_agent_marker(agent_path, str(temp_jj_repo), agent_name, "codex")
+    assert dump_marker(payload) == fast
+
+
+def test_create_agent_marker(temp_jj_repo, make_agent, unique_name):
+    """Test agent marker creation."""
+    # Create sibling workspace with marker
+    agent_name = unique_name("marker-test")
+    agent_path = make_agent(agent_name)
 
     # Verify marker exists and has correct content
     marker_path = Path(agent_path) / AGENT_MARKER_FILE
-    data = json.loads(marker_path.read_text())
+    data = json.loads(marker_path.read_bytes())
 
     assert data["root_workspace"] == str(temp_jj_repo)
     assert data["name"] == agent_name
@@ -113,250 +132,252 @@ def test_create_agent_marker(temp_jj_repo):
     assert data["agent"] == "codex"
 
 
-def test_git_shim_creation(temp_jj_repo):
-    """Test git shim creation and behavior."""
-    client = JJClient()
-
-    # Create sibling workspace
-    agent_name = "shim-test"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
-
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
+def test_git_shim_creation(make_agent, unique_name):
+    """Test .git directory and git shim creation and behavior."""
+    # Create sibling workspace with .git directory and git shim
+    agent_path = make_agent(unique_name("shim-test"), shim=True, git=True)
+    shim_script = Path(agent_path) / SHIM_DIR / "git"
 
-    # Create git shim
-    from kekkai.cli import SHIM_CONTENT
-
-    shim_path = Path(agent_path) / SHIM_DIR
-    shim_path.mkdir(parents=True, exist_ok=True)
-    shim_script = shim_path / "git"
-    shim_script.write_text(SHIM_CONTENT)
-    shim_script.chmod(0o755)
+    # Verify .git directory exists
+    assert (Path(agent_path) / ".git").is_dir()
 
     # Verify shim exists and is executable
     assert shim_script.exists()
     assert os.access(shim_script, os.X_OK)
 
-    # Test that shim blocks git
-    result = subprocess.run(
-        [str(shim_script), "status"], capture_output=True, text=True
-    )
-    assert result.returncode != 0
-    assert "git disabled" in result.stderr
-
-
-def test_git_dir_creation(temp_jj_repo):
-    """Test .git directory creation."""
-    client = JJClient()
-
-    # Create sibling workspace
-    agent_name = "git-dir-test"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
+    # Test that shim blocks git: reports on stderr and exits non-zero
+    content = shim_script.read_text()
+    assert content.startswith("#!/bin/sh\n")
+    assert 'echo "git disabled' in content
+    assert ">&2" in content
+    assert "\nexit 1\n" in content
 
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
 
-    # Create .git directory
-    git_dir = Path(agent_path) / ".git"
-    git_dir.mkdir(parents=True, exist_ok=True)
-
-    # Verify .git directory exists
-    assert git_dir.exists()
-    assert git_dir.is_dir()
-
-
-def test_cleanup(temp_jj_repo):
+def test_cleanup(temp_jj_repo, make_agent, unique_name, jj_client):
     """Test workspace cleanup."""
-    client = JJClient()
-
     # Create sibling workspace with all fixtures
-    agent_name = "cleanup-test"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
+    agent_name = unique_name("cleanup-test")
+    agent_path = make_agent(agent_name, git=True, shim=True)
     jj_workspace_name = compute_jj_workspace_name(str(temp_jj_repo), agent_name)
 
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
-
-    # Create agent marker
-    create_agent_marker(agent_path, str(temp_jj_repo), agent_name, "codex")
-
-    # Create .git directory
-    git_dir = Path(agent_path) / ".git"
-    git_dir.mkdir(parents=True, exist_ok=True)
-
-    # Create shim
-    from kekkai.cli import SHIM_CONTENT
-
-    shim_path = Path(agent_path) / SHIM_DIR
-    shim_path.mkdir(parents=True, exist_ok=True)
-    (shim_path / "git").write_text(SHIM_CONTENT)
-
     # Verify workspace exists
     assert Path(agent_path).exists()
 
     # Run cleanup
-    cleanup(client, jj_workspace_name, agent_path, str(temp_jj_repo))
+    cleanup(jj_client, jj_workspace_name, agent_path, str(temp_jj_repo))
 
     # Verify workspace is gone
     assert not Path(agent_path).exists()
 
     # Verify workspace is forgotten from jj
-    workspaces = client.workspace_list(cwd=str(temp_jj_repo))
+    workspaces = jj_client.workspace_list(cwd=str(temp_jj_repo))
     names = [ws.name for ws in workspaces]
     assert jj_workspace_name not in names
 
 
+def test_ensure_repo_config_runs_once(tmp_path, monkeypatch):
+    """Repo config is applied once, then skipped thanks to the stamp file."""
+    (tmp_path / ".jj").mkdir()
+    client = JJClient()
+    calls = []
+    monkeypatch.setattr(client, "config_set", lambda *args, **kw: calls.append(args))
+
+    ensure_repo_config(client, str(tmp_path))
+    assert (tmp_path / REPO_CONFIGURED_FILE).exists()
+    assert calls == [("snapshot.auto-update-stale", "true")]
+
+    ensure_repo_config(client, str(tmp_path))
+    assert len(calls) == 1
+
+
 def test_check_parent_writable(temp_jj_repo):
     """Test parent directory writability check."""
     # Parent should be writable (it's a temp dir)
     check_parent_writable(str(temp_jj_repo))  # Should not raise
 
 
-def test_markers_hidden_from_jj_status(temp_jj_repo):
-    """Test that markers don't appear in jj status."""
-    client = JJClient()
+def test_check_parent_writable_strict(tmp_path, monkeypatch):
+    """Strict mode should probe with a real write and leave nothing behind."""
+    monkeypatch.setenv("KEKKAI_STRICT_WRITE_CHECK", "1")
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+
+    check_parent_writable(str(repo_dir))  # Should not raise
 
-    # Create sibling workspace
-    agent_name = "status-test"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
+    assert not (tmp_path / ".kekkai-write-test").exists()
 
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
 
-    # Create .git directory (auto-ignored by jj)
-    git_dir = Path(agent_path) / ".git"
-    git_dir.mkdir(parents=True, exist_ok=True)
+@pytest.mark.parametrize("value,probes", [("1", True), ("0", False), ("", False)])
+def test_check_parent_writable_strict_env(tmp_path, monkeypatch, value, probes):
+    """Only KEKKAI_STRICT_WRITE_CHECK=1 should enable the probe write."""
+    monkeypatch.setenv("KEKKAI_STRICT_WRITE_CHECK", value)
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    # A directory in the probe's place makes the probe write fail
+    (tmp_path / ".kekkai-write-test").mkdir()
 
-    # Create agent marker (inside .jj so auto-ignored)
-    create_agent_marker(agent_path, str(temp_jj_repo), agent_name, "codex")
+    if probes:
+        with pytest.raises(PermissionError):
+            check_parent_writable(str(repo_dir))
+    else:
+        check_parent_writable(str(repo_dir))  # Should not raise
+
+
+def test_markers_hidden_from_jj_status(make_agent, unique_name, jj_client):
+    """Test that markers don't appear in jj status."""
+    # Create sibling workspace with .git directory (auto-ignored by jj)
+    # and agent marker (inside .jj so auto-ignored)
+    agent_path = make_agent(unique_name("status-test"), git=True)
 
     # Get jj status from the agent workspace
-    status = client.status(cwd=agent_path)
+    status = jj_client.status(cwd=agent_path)
 
     # Verify markers don't appear in status
     assert "kekkai-agent" not in status
 
 
-def test_nested_agent_creation(temp_jj_repo):
-    """Test creating agent from within another agent workspace."""
-    client = JJClient()
+def test_nested_agent_creation(
+    temp_jj_repo, monkeypatch, make_agent, unique_name, jj_client
+):
+    """Test finding the root and creating an agent from another agent."""
+    # find_root_workspace from the root itself should return the root
+    monkeypatch.chdir(temp_jj_repo)
+    root = find_root_workspace(jj_client)
+    assert Path(root).resolve() == temp_jj_repo.resolve()
 
     # Create first agent workspace
-    agent1_name = "agent1"
-    agent1_path = compute_agent_path(str(temp_jj_repo), agent1_name)
-
-    client.workspace_add(agent1_path, cwd=str(temp_jj_repo))
-    create_agent_marker(agent1_path, str(temp_jj_repo), agent1_name, "codex")
+    agent1_path = make_agent(unique_name("agent1"))
 
     # Change to agent1 directory
-    old_cwd = os.getcwd()
-    os.chdir(agent1_path)
-    try:
-        # find_root_workspace from agent1 should return original root
-        root = find_root_workspace(client)
-        assert root == str(temp_jj_repo)
-
-        # Computing a new agent path from root should give sibling to original root
-        agent2_name = "agent2"
-        agent2_path = compute_agent_path(root, agent2_name)
-
-        expected = str(temp_jj_repo.parent / f"{temp_jj_repo.name}-{agent2_name}")
-        assert agent2_path == expected
-    finally:
-        os.chdir(old_cwd)
+    monkeypatch.chdir(agent1_path)
 
+    # find_root_workspace from agent1 should return original root
+    root = find_root_workspace(jj_client)
+    assert root == str(temp_jj_repo)
 
-def test_list_workspaces_empty(temp_jj_repo):
-    """Test listing workspaces when none exist."""
-    client = JJClient()
+    # Computing a new agent path from root should give sibling to original root
+    agent2_name = unique_name("agent2")
+    agent2_path = compute_agent_path(root, agent2_name)
 
-    workspaces = client.workspace_list(cwd=str(temp_jj_repo))
-    repo_name = temp_jj_repo.name
-    prefix = f"{repo_name}-"
+    expected = str(temp_jj_repo.parent / f"{temp_jj_repo.name}-{agent2_name}")
+    assert agent2_path == expected
 
-    agent_count = sum(
-        1
-        for ws in workspaces
-        if ws.name != "default" and ws.name.startswith(prefix)
-    )
 
-    assert agent_count == 0
+@pytest.mark.parametrize("n_agents", [0, 2, 5])
+def test_list_workspaces(
+    temp_jj_repo, monkeypatch, capsys, make_agent, unique_name, n_agents
+):
+    """Test listing workspaces with a varying number of agents."""
+    names = [unique_name(f"agent{i}") for i in range(n_agents)]
+    for name in names:
+        make_agent(name)
 
+    monkeypatch.chdir(temp_jj_repo)
+    list_workspaces()
 
-def test_list_workspaces_with_agents(temp_jj_repo):
-    """Test listing workspaces with agents."""
-    client = JJClient()
+    # One line per agent, or a single notice when there are none
+    lines = capsys.readouterr().out.splitlines()
+    if not names:
+        assert lines == ["No workspaces"]
+    else:
+        assert sorted(line.split(" ", 1)[0] for line in lines) == sorted(names)
 
-    # Create two agent workspaces
-    agents = ["agent1", "agent2"]
-    for name in agents:
-        agent_path = compute_agent_path(str(temp_jj_repo), name)
-        client.workspace_add(agent_path, cwd=str(temp_jj_repo))
-        create_agent_marker(agent_path, str(temp_jj_repo), name, "codex")
 
-    # List workspaces
-    workspaces = client.workspace_list(cwd=str(temp_jj_repo))
-    repo_name = temp_jj_repo.name
-    prefix = f"{repo_name}-"
+def test_list_workspaces_unreadable_marker(
+    temp_jj_repo, monkeypatch, capsys, make_agent, unique_name
+):
+    """An agent whose marker cannot be parsed is listed as unknown."""
+    agent_name = unique_name("broken")
+    agent_path = make_agent(agent_name)
+    (Path(agent_path) / AGENT_MARKER_FILE).write_bytes(b"\xff not json")
 
-    found_agents = []
-    for ws in workspaces:
-        if ws.name != "default" and ws.name.startswith(prefix):
-            agent_name = ws.name[len(prefix) :]
-            # Verify marker exists
-            agent_path = temp_jj_repo.parent / ws.name
-            marker_path = agent_path / AGENT_MARKER_FILE
-            if marker_path.exists():
-                found_agents.append(agent_name)
+    monkeypatch.chdir(temp_jj_repo)
+    list_workspaces()
 
-    assert len(found_agents) == 2
+    assert capsys.readouterr().out.startswith(f"{agent_name} [unknown]: ")
 
 
-def test_spinner_shown_during_setup(temp_jj_repo, monkeypatch):
+def test_spinner_shown_during_setup(temp_jj_repo, tmp_path, monkeypatch, unique_name):
     """Test that spinner is shown during workspace setup before Claude launches."""
     from io import StringIO
 
     from rich.console import Console
 
-    # Create mock claude binary that records when it was called
-    mock_bin = temp_jj_repo / "mock-bin"
-    mock_bin.mkdir()
-    mock_claude = mock_bin / "claude"
-    call_marker = temp_jj_repo / "claude-called"
-    mock_claude.write_text(f"#!/bin/sh\ntouch {call_marker}\nexit 0\n")
-    mock_claude.chmod(0o755)
+    # Stub the agent launch to record that workspace setup completed
+    call_marker = tmp_path / "claude-called"
 
-    # Prepend mock bin to PATH
-    original_path = os.environ.get("PATH", "")
-    monkeypatch.setenv("PATH", f"{mock_bin}:{original_path}")
+    def fake_launch(agent, workspace_path, env):
+        call_marker.write_text("ok")
+        return 0
 
-    # Mock input() to auto-answer cleanup prompt with 'n'
-    monkeypatch.setattr("builtins.input", lambda _: "n")
+    monkeypatch.setattr("kekkai.cli.launch_agent", fake_launch)
 
     # Capture console output by forcing terminal mode with a file output
     output_buffer = StringIO()
 
     # Patch Console to capture spinner output
-    class TestConsole(Console):
-        def __init__(self, *args, **kwargs):
-            kwargs["force_terminal"] = True
-            kwargs["file"] = output_buffer
-            super().__init__(*args, **kwargs)
-
-    monkeypatch.setattr("kekkai.cli.Console", TestConsole)
+    monkeypatch.setattr(
+        "rich.console.Console",
+        functools.partial(Console, force_terminal=True, file=output_buffer),
+    )
 
     # Change to temp repo directory
-    old_cwd = os.getcwd()
-    os.chdir(temp_jj_repo)
-    try:
-        run_agent("spinner-test", AGENTS["claude"])
-    finally:
-        os.chdir(old_cwd)
+    monkeypatch.chdir(temp_jj_repo)
+    run_agent(unique_name("spinner-test"), AGENTS["claude"])
 
     # Verify mock claude was called (workspace setup completed)
-    assert call_marker.exists(), "Mock claude should have been called"
+    assert call_marker.exists(), "Agent launch should have been called"
 
     # Verify spinner message was shown
     output = output_buffer.getvalue().lower()
     assert "summoning" in output, f"Spinner message not found in output: {output}"
 
 
+@pytest.mark.parametrize(
+    "script,expected",
+    [
+        ("echo 'Working copy changes:'\necho 'M file.txt'\n", True),
+        ("echo 'The working copy has no changes.'\n", False),
+        ("echo 'Error: something broke' >&2\nexit 1\n", None),
+    ],
+)
+def test_has_uncommitted_changes(tmp_path, stub_jj, script, expected):
+    """jj status decides the workspace state, which is unknown on failure."""
+    assert has_uncommitted_changes(stub_jj(script), str(tmp_path)) is expected
+
+
+@pytest.mark.parametrize("dirty", [True, False])
+def test_keep_workspace_prompt_non_interactive(monkeypatch, dirty):
+    """Without a TTY the prompt is skipped and only dirty workspaces are kept."""
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: False)
+    monkeypatch.setattr("builtins.input", lambda _: pytest.fail("prompted"))
+
+    assert keep_workspace_prompt(dirty) is dirty
+
+
+@pytest.mark.parametrize(
+    "answer,expected", [("y", True), (" Yes ", True), ("n", False), ("", False)]
+)
+def test_keep_workspace_prompt_interactive(monkeypatch, answer, expected):
+    """With a TTY the user's answer decides, whatever the workspace state."""
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: True)
+    monkeypatch.setattr("builtins.input", lambda _: answer)
+
+    assert keep_workspace_prompt(dirty=True) is expected
+
+
+def test_keep_workspace_prompt_eof(monkeypatch):
+    """End of input at the prompt means the workspace is removed."""
+
+    def raise_eof(_):
+        raise EOFError
+
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: True)
+    monkeypatch.setattr("builtins.input", raise_eof)
+
+    assert keep_workspace_prompt(dirty=True) is False
+
+
 def test_help_shows_version(capsys, monkeypatch):
     """Help output should include the package version."""
     from kekkai import __version__
@@ -383,49 +404,38 @@ def test_version_flag_outputs_version(capsys, monkeypatch):
     assert f"kekkai {__version__}" in output
 
 
-def test_look_workspace_creates_new_revision(temp_jj_repo, monkeypatch):
+def change_ids(repo_dir, revset: str) -> list[str]:
+    """Return the change ids selected by revset, one per revision."""
+    result = subprocess.run(
+        ["jj", "log", "-r", revset, "--no-graph", "--template", 'change_id ++ "\\n"'],
+        cwd=repo_dir,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.stdout.decode("ascii").split()
+
+
+def test_look_workspace_creates_new_revision(
+    temp_jj_repo, monkeypatch, make_agent, unique_name
+):
     """look should create a new revision based on the agent workspace."""
-    client = JJClient()
-    agent_name = "look-agent"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
-
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
-    create_agent_marker(agent_path, str(temp_jj_repo), agent_name, "codex")
-
-    def current_change_id() -> str:
-        result = subprocess.run(
-            [
-                "jj",
-                "log",
-                "-r",
-                "@",
-                "--no-graph",
-                "--template",
-                "change_id",
-            ],
-            cwd=temp_jj_repo,
-            check=True,
-            capture_output=True,
-            text=True,
-        )
-        return result.stdout.strip()
-
-    before = current_change_id()
+    agent_name = unique_name("look-agent")
+    make_agent(agent_name)
+
     monkeypatch.chdir(temp_jj_repo)
     look_workspace(agent_name)
-    after = current_change_id()
 
-    assert before != after
+    # The agent's working copy is a fresh commit, so it can only be the
+    # parent of the root's @ if look created a new revision on top of it.
+    ws_name = compute_jj_workspace_name(str(temp_jj_repo), agent_name)
+    assert len(change_ids(temp_jj_repo, f'@- & "{ws_name}"@')) == 1
 
 
-def test_look_workspace_requires_root(temp_jj_repo, monkeypatch, capsys):
+def test_look_workspace_requires_root(monkeypatch, capsys, make_agent, unique_name):
     """look should fail when run from an agent workspace."""
-    client = JJClient()
-    agent_name = "agent-root-check"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
-
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
-    create_agent_marker(agent_path, str(temp_jj_repo), agent_name, "codex")
+    agent_name = unique_name("agent-root-check")
+    agent_path = make_agent(agent_name)
 
     monkeypatch.chdir(agent_path)
     with pytest.raises(SystemExit) as excinfo:
@@ -436,14 +446,14 @@ def test_look_workspace_requires_root(temp_jj_repo, monkeypatch, capsys):
     assert "root workspace" in err
 
 
-def test_look_workspace_suggests_similar_names(temp_jj_repo, monkeypatch, capsys):
+def test_look_workspace_suggests_similar_names(
+    temp_jj_repo, monkeypatch, capsys, make_agent
+):
     """look should suggest similar agent names when not found."""
-    client = JJClient()
-    agent_name = "feature-preview"
-    agent_path = compute_agent_path(str(temp_jj_repo), agent_name)
-
-    client.workspace_add(agent_path, cwd=str(temp_jj_repo))
-    create_agent_marker(agent_path, str(temp_jj_repo), agent_name, "codex")
+    # Short literal names keep the typo significant for the scorer; the
+    # workspaces are removed after the test, so they cannot collide.
+    make_agent("feature-preview")
+    make_agent("bugfix-login")
 
     monkeypatch.chdir(temp_jj_repo)
     with pytest.raises(SystemExit) as excinfo:
@@ -451,5 +461,5 @@ def test_look_workspace_suggests_similar_names(temp_jj_repo, monkeypatch, capsys
 
     assert excinfo.value.code == 1
     err = capsys.readouterr().err.lower()
-    assert "did you mean" in err
-    assert agent_name in err
+    assert "did you mean: feature-preview\n" in err
+    assert "bugfix-login" not in err
@@ -7,13 +7,34 @@ from pathlib import Path
 import pytest
 
 from kekkai.errors import NotJJRepoError, WorkspaceExistsError
-from kekkai.jj import JJClient
-
-
-def test_workspace_root(temp_jj_repo):
+from kekkai.jj import Workspace, _parse_line_fallback, _parse_workspace_line
+
+
+@pytest.mark.parametrize(
+    "line,expected",
+    [
+        (
+            "default: wpxqlmox f3c3a79d (no description set)",
+            Workspace("default", "wpxqlmox", "f3c3a79d", "(no description set)"),
+        ),
+        ("repo-a: abc def ", Workspace("repo-a", "abc", "def", "")),
+        ("ab\t: b x) ", None),  # tab inside the name
+        ("ws: a\u00a0b c d", None),  # non-breaking space inside a field
+        ("ws:  abc def x", None),  # empty change id
+        (": abc def x", None),  # empty name
+        ("ws abc def x", None),  # missing colon
+        ("ws: abc", None),  # too few fields
+    ],
+)
+def test_parse_workspace_line(line, expected):
+    """The split fast path must agree with the regex on every line."""
+    assert _parse_workspace_line(line) == expected
+    assert _parse_line_fallback(line) == expected
+
+
+def test_workspace_root(temp_jj_repo, jj_client):
     """Test getting workspace root."""
-    client = JJClient()
-    root = client.workspace_root(cwd=str(temp_jj_repo))
+    root = jj_client.workspace_root(cwd=str(temp_jj_repo))
 
     # Resolve symlinks for comparison (macOS /var -> /private/var)
     expected = temp_jj_repo.resolve()
@@ -22,37 +43,34 @@ def test_workspace_root(temp_jj_repo):
     assert actual == expected
 
 
-def test_workspace_add(temp_jj_repo):
+def test_workspace_add(temp_jj_repo, tmp_path, jj_client):
     """Test adding a workspace."""
-    client = JJClient()
-    workspace_path = temp_jj_repo / "test-workspace"
+    workspace_path = tmp_path / "test-workspace"
 
     # Add workspace
-    client.workspace_add(str(workspace_path), cwd=str(temp_jj_repo))
+    jj_client.workspace_add(str(workspace_path), cwd=str(temp_jj_repo))
 
     # Verify workspace directory exists
     assert workspace_path.exists()
 
     # Adding same workspace again should fail
     with pytest.raises(WorkspaceExistsError):
-        client.workspace_add(str(workspace_path), cwd=str(temp_jj_repo))
+        jj_client.workspace_add(str(workspace_path), cwd=str(temp_jj_repo))
 
 
-def test_workspace_list(temp_jj_repo):
+def test_workspace_list(temp_jj_repo, tmp_path, jj_client):
     """Test listing workspaces."""
-    client = JJClient()
-
     # Initially should have just "default" workspace
-    workspaces = client.workspace_list(cwd=str(temp_jj_repo))
+    workspaces = jj_client.workspace_list(cwd=str(temp_jj_repo))
     assert len(workspaces) == 1
     assert workspaces[0].name == "default"
 
     # Add a workspace
-    workspace_path = temp_jj_repo / "agent-1"
-    client.workspace_add(str(workspace_path), cwd=str(temp_jj_repo))
+    workspace_path = tmp_path / "agent-1"
+    jj_client.workspace_add(str(workspace_path), cwd=str(temp_jj_repo))
 
     # Should now have 2 workspaces
-    workspaces = client.workspace_list(cwd=str(temp_jj_repo))
+    workspaces = jj_client.workspace_list(cwd=str(temp_jj_repo))
     assert len(workspaces) == 2
 
     # Find agent-1
@@ -60,19 +78,17 @@ def test_workspace_list(temp_jj_repo):
     assert "agent-1" in names
 
 
-def test_workspace_forget(temp_jj_repo):
+def test_workspace_forget(temp_jj_repo, tmp_path, jj_client):
     """Test forgetting a workspace."""
-    client = JJClient()
-
     # Add a workspace
-    workspace_path = temp_jj_repo / "to-forget"
-    client.workspace_add(str(workspace_path), cwd=str(temp_jj_repo))
+    workspace_path = tmp_path / "to-forget"
+    jj_client.workspace_add(str(workspace_path), cwd=str(temp_jj_repo))
 
     # Forget it
-    client.workspace_forget("to-forget", cwd=str(temp_jj_repo))
+    jj_client.workspace_forget("to-forget", cwd=str(temp_jj_repo))
 
     # Should only have default workspace now
-    workspaces = client.workspace_list(cwd=str(temp_jj_repo))
+    workspaces = jj_client.workspace_list(cwd=str(temp_jj_repo))
     names = [ws.name for ws in workspaces]
     assert "to-forget" not in names
 
@@ -80,9 +96,8 @@ def test_workspace_forget(temp_jj_repo):
     assert workspace_path.exists()
 
 
-def test_new_revision(temp_jj_repo):
+def test_new_revision(temp_jj_repo, jj_client):
     """Test creating a new revision."""
-    client = JJClient()
 
     def current_change_id() -> str:
         result = subprocess.run(
@@ -97,21 +112,45 @@ def test_new_revision(temp_jj_repo):
             ],
             cwd=temp_jj_repo,
             check=True,
-            capture_output=True,
-            text=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
         )
-        return result.stdout.strip()
+        return result.stdout.decode("ascii").strip()
 
     before = current_change_id()
-    client.new("@", cwd=str(temp_jj_repo))
+    jj_client.new("@", cwd=str(temp_jj_repo))
     after = current_change_id()
 
     assert before != after
 
 
-def test_not_jj_repo(temp_non_jj_dir):
+def test_not_jj_repo(temp_non_jj_dir, jj_client):
     """Test error when not in a jj repo."""
-    client = JJClient()
+    with pytest.raises(NotJJRepoError):
+        jj_client.workspace_root(cwd=str(temp_non_jj_dir))
 
+
+def test_status_iter_verbose_stderr(tmp_path, stub_jj):
+    """A jj writing more than a pipe buffer to stderr must not block."""
+    client = stub_jj(
+        "yes 'Warning: refused to snapshot' | head -c 200000 >&2\n"
+        "echo 'Working copy changes:'\n",
+    )
+    assert list(client.status_iter(cwd=str(tmp_path))) == ["Working copy changes:\n"]
+
+
+def test_status_iter_error(tmp_path, stub_jj):
+    """A failing jj status raises the typed error from its stderr."""
+    client = stub_jj("echo 'Error: There is no jj repo in \".\"' >&2\nexit 1\n")
     with pytest.raises(NotJJRepoError):
-        client.workspace_root(cwd=str(temp_non_jj_dir))
+        list(client.status_iter(cwd=str(tmp_path)))
+
+
+def test_workspace_list_keeps_line_separators_in_summary(tmp_path, stub_jj):
+    """Only newlines end a workspace line; other separators stay in summaries."""
+    client = stub_jj(
+        "printf 'default: abc def first\\013second\\n'\n"
+        "printf 'repo-a: ghi jkl one\\342\\200\\250two\\n'\n",
+    )
+    workspaces = client.workspace_list(cwd=str(tmp_path))
+    assert [ws.summary for ws in workspaces] == ["first\x0bsecond", "one\u2028two"]